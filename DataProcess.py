@@ -2,9 +2,15 @@ import os
 import datetime
 import shutil
 import re
+import numpy as np
 import pandas as pd
 import logging
-from typing import Optional
+from typing import Callable, Dict, Optional, Union
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 class DataProcessor:
     """
@@ -47,6 +53,20 @@ class DataProcessor:
             "Additional information": "Would you like to include additional information? "
         }
 
+        # Source columns read from the workbook: the directly mapped ones plus those used for filtering
+        # and for the specially handled target columns
+        self.source_columns = {src_col for src_col in self.header_mapping.values() if src_col is not None} | {
+            "Type",
+            "Are you a member of the Artificial Intelligence Researchers Association?",
+            "Is your organisation a member of AI Forum NZ?",
+            "Full Name",
+            "Business / Organisation Name",
+            "Professional website/ Social URL",
+            "Website",
+            "Organisation",
+            "Business / Organisation Description",
+        }
+
         # Rules to modify content of specific columns
         self.rules = {
             "Which of the following apply to you?": self.replace_semicolon_with_pipe,
@@ -80,21 +100,47 @@ class DataProcessor:
             'it': 'IT',
         }
 
+        # Single pattern matching any abbreviation as a whole word, so each text is scanned once.
+        # Each abbreviation has its own group, whose index selects the replacement.
+        self._abbr_map = {abbr.lower(): replacement for abbr, replacement in self.tech_abbreviations.items()}
+        abbrs = sorted(self._abbr_map, key=len, reverse=True)
+        self._abbr_replacements = [self._abbr_map[abbr] for abbr in abbrs]
+        self._abbr_re = re.compile(
+            r'(?<![a-zA-Z])(?:' +
+            '|'.join('(' + re.escape(abbr) + ')' for abbr in abbrs) +
+            r')(?![a-zA-Z])',
+            flags=re.IGNORECASE
+        )
+
+        # Aho-Corasick automaton over the lowercase abbreviations, used instead of the regex when available
+        self._abbr_automaton = None
+        if ahocorasick is not None:
+            self._abbr_automaton = ahocorasick.Automaton()
+            for abbr, replacement in self._abbr_map.items():
+                self._abbr_automaton.add_word(abbr, (len(abbr), replacement))
+            self._abbr_automaton.make_automaton()
+
         # Configure logging
         logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-    def read_excel(self, file_path: str) -> Optional[pd.DataFrame]:
+    def read_excel(self, file_path: str, usecols: Optional[Callable[[str], bool]] = None) -> Optional[pd.DataFrame]:
         """
         Reads an Excel file and returns a pandas DataFrame.
 
         Parameters:
             file_path (str): The path to the Excel file.
+            usecols (Callable[[str], bool], optional): Selects the columns to read by name; all columns if None.
 
         Returns:
             pd.DataFrame: The DataFrame containing the Excel data, or None if an error occurs.
         """
         try:
-            df = pd.read_excel(file_path)
+            try:
+                # The Rust-based calamine engine parses .xlsx much faster than openpyxl
+                df = pd.read_excel(file_path, usecols=usecols, engine='calamine')
+            except ImportError:
+                # python-calamine is not installed, fall back to the default engine
+                df = pd.read_excel(file_path, usecols=usecols)
             logging.info(f"Successfully read Excel file: {file_path}")
             return df
         except FileNotFoundError:
@@ -104,6 +150,66 @@ class DataProcessor:
             logging.error(f"Error reading file: {file_path}, Error: {str(e)}")
             return None
 
+    def write_excel(self, df: pd.DataFrame, file_path: str) -> None:
+        """
+        Writes a DataFrame to an Excel file without the index.
+
+        Parameters:
+            df (pd.DataFrame): The DataFrame to be written.
+            file_path (str): The path to the Excel file.
+        """
+        try:
+            # xlsxwriter streams the sheet out faster than the default openpyxl writer
+            df.to_excel(file_path, index=False, engine='xlsxwriter')
+        except ImportError:
+            # xlsxwriter is not installed, fall back to the default engine
+            df.to_excel(file_path, index=False)
+
+    def read_target(self, file_path: str) -> Optional[pd.DataFrame]:
+        """
+        Reads the target data, preferring its Parquet sidecar when it was written together with the Excel file.
+
+        Parameters:
+            file_path (str): The path to the target Excel file.
+
+        Returns:
+            pd.DataFrame: The DataFrame containing the target data, or None if an error occurs.
+        """
+        sidecar_path = file_path + '.parquet'
+        if os.path.exists(sidecar_path):
+            try:
+                df = pd.read_parquet(sidecar_path)
+                # The sidecar records the modification time and size of the Excel file it was written with;
+                # any other Excel file (e.g. a restored backup, whatever its mtime) must be read itself
+                stat = os.stat(file_path)
+                if df.attrs.get('xlsx_stat') == [stat.st_mtime_ns, stat.st_size]:
+                    df.attrs = {}
+                    logging.info(f"Successfully read Parquet sidecar: {sidecar_path}")
+                    return df
+                logging.info(f"Parquet sidecar does not match {file_path}, reading the Excel file")
+            except Exception as e:
+                logging.warning(f"Error reading Parquet sidecar: {sidecar_path}, Error: {str(e)}")
+        return self.read_excel(file_path)
+
+    def write_target(self, df: pd.DataFrame, file_path: str) -> None:
+        """
+        Writes the target data to the Excel file and refreshes its Parquet sidecar.
+
+        Parameters:
+            df (pd.DataFrame): The DataFrame to be written.
+            file_path (str): The path to the target Excel file.
+        """
+        self.write_excel(df, file_path)
+        sidecar_path = file_path + '.parquet'
+        try:
+            stat = os.stat(file_path)
+            sidecar_df = df.copy(deep=False)
+            sidecar_df.attrs = {'xlsx_stat': [stat.st_mtime_ns, stat.st_size]}
+            sidecar_df.to_parquet(sidecar_path, index=False)
+        except Exception as e:
+            # A stale sidecar does not match the Excel file just written, so it will be ignored
+            logging.warning(f"Error writing Parquet sidecar: {sidecar_path}, Error: {str(e)}")
+
     def process_data(self, src_df: pd.DataFrame) -> pd.DataFrame:
         """
         Processes the source DataFrame by mapping headers and modifying content.
@@ -114,76 +220,86 @@ class DataProcessor:
         Returns:
             pd.DataFrame: The processed DataFrame ready for export.
         """
-        # Initialize the target DataFrame with the target columns
-        target_columns = list(self.header_mapping.keys())
-        target_df = pd.DataFrame(columns=target_columns)
+        # Map and fill headers from source columns, then build the target DataFrame in one allocation.
+        # Target columns without mapped data are left empty.
+        target_data = self.match_and_fill_headers(src_df)
+        target_df = pd.DataFrame(target_data, columns=list(self.header_mapping))
 
-        # Map and fill headers from source to target DataFrame
-        target_df = self.match_and_fill_headers(src_df, target_df)
+        # Store text columns as Arrow strings so string operations and comparisons run as Arrow kernels
+        target_df = self.convert_text_columns(target_df)
 
         # Modify the content according to the rules
         target_df = self.modify_content(target_df)
 
         return target_df
 
-    def match_and_fill_headers(self, src_df: pd.DataFrame, target_df: pd.DataFrame) -> pd.DataFrame:
+    def match_and_fill_headers(self, src_df: pd.DataFrame) -> Dict[str, Union[pd.Series, np.ndarray]]:
         """
-        Maps source DataFrame columns to target DataFrame columns and fills data.
+        Maps source DataFrame columns to target columns and computes their data.
 
         Parameters:
             src_df (pd.DataFrame): The source DataFrame.
-            target_df (pd.DataFrame): The target DataFrame to be filled.
 
         Returns:
-            pd.DataFrame: The target DataFrame with mapped and filled data.
+            dict: The data of each mapped target column, keyed by target column name.
         """
-        # Filter out specific rows based on conditions
-        filtered_src_df = src_df[
-            ~(
-                (src_df["Type"] == "Individual (e.g. researcher, academic or engineers)") &
-                (src_df["Are you a member of the Artificial Intelligence Researchers Association?"] == "Yes")
-            )
-        ]
+        # Rows to keep, carried as a mask so the source DataFrame is never copied as a whole
+        is_individual = src_df["Type"].eq("Individual (e.g. researcher, academic or engineers)")
+        keep = ~(
+            is_individual &
+            src_df["Are you a member of the Artificial Intelligence Researchers Association?"].eq("Yes")
+        )
+
+        # Row-wise conditions shared by the special columns
+        is_individual = is_individual[keep]
+        is_forum_member = (
+            src_df.loc[keep, "Type"].eq("Business / Organisation") &
+            src_df.loc[keep, "Is your organisation a member of AI Forum NZ?"].eq("Yes")
+        )
+
+        # Direct mapping of columns, projected in a single selection
+        direct_map = {
+            target_col: src_col for target_col, src_col in self.header_mapping.items()
+            if src_col is not None and src_col in src_df.columns
+        }
+        direct_df = src_df.loc[keep, list(direct_map.values())]
+        target_data = {target_col: direct_df.iloc[:, i] for i, target_col in enumerate(direct_map)}
+
+        # Special handling for columns combined from several source columns
+        target_data["Tags"] = np.where(is_forum_member, "AI Forum NZ", None)
+        target_data["label"] = src_df.loc[keep, "Full Name"].where(
+            is_individual, src_df.loc[keep, "Business / Organisation Name"]
+        )
+        target_data["Website"] = src_df.loc[keep, "Professional website/ Social URL"].where(
+            is_individual, src_df.loc[keep, "Website"]
+        )
+        target_data["Business / Organisation Description"] = src_df.loc[keep, "Organisation"].where(
+            is_individual, src_df.loc[keep, "Business / Organisation Description"]
+        )
+
+        return target_data
 
-        for target_col, src_col in self.header_mapping.items():
-            if target_col == "Tags":
-                # Special handling for 'Tags' column
-                target_df["Tags"] = filtered_src_df.apply(
-                    lambda row: "AI Forum NZ" if (
-                        row["Type"] == "Business / Organisation" and
-                        row["Is your organisation a member of AI Forum NZ?"] == "Yes"
-                    ) else None,
-                    axis=1
-                )
-            elif target_col == "label":
-                # Special handling for 'label' column
-                target_df["label"] = filtered_src_df.apply(
-                    lambda row: row["Full Name"] if row["Type"] == "Individual (e.g. researcher, academic or engineers)"
-                    else row["Business / Organisation Name"],
-                    axis=1
-                )
-            elif target_col == "Website":
-                # Special handling for 'Website' column
-                target_df["Website"] = filtered_src_df.apply(
-                    lambda row: row["Professional website/ Social URL"] if row["Type"] == "Individual (e.g. researcher, academic or engineers)"
-                    else row["Website"],
-                    axis=1
-                )
-            elif target_col == "Business / Organisation Description":
-                # Special handling for 'Business / Organisation Description' column
-                target_df["Business / Organisation Description"] = filtered_src_df.apply(
-                    lambda row: row["Organisation"] if row["Type"] == "Individual (e.g. researcher, academic or engineers)"
-                    else row["Business / Organisation Description"],
-                    axis=1
-                )
-            elif src_col in filtered_src_df.columns:
-                # Direct mapping of columns
-                target_df[target_col] = filtered_src_df[src_col]
-            else:
-                # Assign None if source column not found
-                target_df[target_col] = None
+    @staticmethod
+    def convert_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts columns that hold only text to the PyArrow-backed string dtype.
 
-        return target_df
+        Parameters:
+            df (pd.DataFrame): The DataFrame to be converted.
+
+        Returns:
+            pd.DataFrame: The DataFrame with text columns stored as Arrow strings,
+            or unchanged if PyArrow is not installed.
+        """
+        # Mixed columns (e.g. numbers and text) are left alone so their values are not turned into text
+        text_columns = [
+            column for column in df.columns
+            if pd.api.types.infer_dtype(df[column], skipna=True) == 'string'
+        ]
+        try:
+            return df.astype({column: 'string[pyarrow]' for column in text_columns})
+        except ImportError:
+            return df
 
     def modify_content(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -197,10 +313,18 @@ class DataProcessor:
         """
         # Apply modification rules to the specified columns
         for column, rule in self.rules.items():
-            if column in df.columns:
-                df[column] = df[column].apply(rule)
+            # Columns without any text (e.g. all empty) have no string accessor and need no changes
+            if column in df.columns and (
+                pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column])
+            ):
+                df[column] = rule(df[column])
                 # Fix abbreviations in the modified columns
-                df[column] = df[column].apply(self.fix_abbreviations)
+                if self._abbr_automaton is not None:
+                    df[column] = df[column].map(self.fix_abbreviations, na_action='ignore').astype(df[column].dtype)
+                else:
+                    df[column] = self._keep_non_text(
+                        df[column].str.replace(self._abbr_re, self._replace_abbreviation, regex=True), df[column]
+                    )
         return df
 
     def fix_abbreviations(self, text: str) -> str:
@@ -216,43 +340,82 @@ class DataProcessor:
         if not isinstance(text, str):
             return text
 
-        # Iterate over each abbreviation and replace it in the text
-        for abbr, replacement in self.tech_abbreviations.items():
-            # Regular expression pattern to match the abbreviation as a whole word
-            pattern = r'(?<![a-zA-Z])' + re.escape(abbr) + r'(?![a-zA-Z])'
-            # Replace the abbreviation with the capitalized form
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        return text
+        # Non-ASCII text goes through the regex, whose case-insensitive matching covers
+        # characters that simple lowercasing does not map onto the abbreviations
+        if self._abbr_automaton is None or not text.isascii():
+            # Replace every abbreviation in a single pass over the text
+            return self._abbr_re.sub(self._replace_abbreviation, text)
+
+        # Scan once with the automaton and keep only matches that form whole words
+        pieces = []
+        last_end = 0
+        for end, (length, replacement) in self._abbr_automaton.iter_long(text.lower()):
+            start = end - length + 1
+            # The text is ASCII here, so isalpha() is the same [a-zA-Z] check the regex uses
+            if (start == 0 or not text[start - 1].isalpha()) and \
+                    (end + 1 == len(text) or not text[end + 1].isalpha()):
+                pieces.append(text[last_end:start])
+                pieces.append(replacement)
+                last_end = end + 1
+        if not pieces:
+            return text
+        pieces.append(text[last_end:])
+        return ''.join(pieces)
+
+    def _replace_abbreviation(self, match: re.Match) -> str:
+        """
+        Returns the capitalized form for an abbreviation matched by the combined pattern.
+
+        Parameters:
+            match (re.Match): The regex match of an abbreviation.
+
+        Returns:
+            str: The capitalized abbreviation.
+        """
+        return self._abbr_replacements[match.lastindex - 1]
+
+    @staticmethod
+    def replace_semicolon_with_pipe(column: pd.Series) -> pd.Series:
+        """
+        Replaces semicolons with pipes in the text column.
+
+        Parameters:
+            column (pd.Series): The text column to be modified.
+
+        Returns:
+            pd.Series: The modified column.
+        """
+        return DataProcessor._keep_non_text(column.str.replace(";", "|", regex=False), column)
 
     @staticmethod
-    def replace_semicolon_with_pipe(text: str) -> str:
+    def replace_semicolon_with_pipe_and_title(column: pd.Series) -> pd.Series:
         """
-        Replaces semicolons with pipes in the text.
+        Replaces semicolons with pipes and converts the text column to title case.
 
         Parameters:
-            text (str): The text to be modified.
+            column (pd.Series): The text column to be modified.
 
         Returns:
-            str: The modified text.
+            pd.Series: The modified column in title case.
         """
-        if isinstance(text, str):
-            return text.replace(";", "|")
-        return text
+        return DataProcessor._keep_non_text(column.str.replace(";", "|", regex=False).str.title(), column)
 
     @staticmethod
-    def replace_semicolon_with_pipe_and_title(text: str) -> str:
+    def _keep_non_text(modified: pd.Series, column: pd.Series) -> pd.Series:
         """
-        Replaces semicolons with pipes and converts text to title case.
+        Restores the values of a column that are not text, which the .str accessor turns into NaN.
 
         Parameters:
-            text (str): The text to be modified.
+            modified (pd.Series): The column after the string operations.
+            column (pd.Series): The column before the string operations.
 
         Returns:
-            str: The modified text in title case.
+            pd.Series: The modified column with non-text values (e.g. numbers in a mixed column) kept as they were.
         """
-        if isinstance(text, str):
-            return text.replace(";", "|").title()
-        return text
+        if isinstance(column.dtype, pd.StringDtype) or \
+                pd.api.types.infer_dtype(column, skipna=True) in ('string', 'empty'):
+            return modified
+        return modified.where(column.map(lambda value: isinstance(value, str)), column)
 
     def update_excel(self, src_file_path: str, target_file_path: str) -> bool:
         """
@@ -265,7 +428,8 @@ class DataProcessor:
         Returns:
             bool: True if the update is successful, False otherwise.
         """
-        src_df = self.read_excel(src_file_path)
+        # Only parse the source columns that are actually used
+        src_df = self.read_excel(src_file_path, usecols=self.source_columns.__contains__)
         if src_df is None:
             return False
 
@@ -279,68 +443,80 @@ class DataProcessor:
                 shutil.copy2(target_file_path, backup_path)
                 logging.info(f"Backup created: {backup_path}")
 
-                existing_data = self.read_excel(target_file_path)
+                existing_data = self.read_target(target_file_path)
                 if existing_data is not None:
-                    updated_count = 0
-                    final_data = existing_data.copy()
-
-                    # Update existing records
-                    for index, new_row in new_data.iterrows():
-                        mask = existing_data['Id'] == new_row['Id']
-                        if mask.any():
-                            old_row = existing_data.loc[mask].iloc[0]
-                            columns_to_compare = [col for col in new_row.index if col != 'Id']
-                            has_changes = False
-                            changes_log = []
-
-                            logging.info(f"Checking record with ID {new_row['Id']}, label: {new_row['label']}")
-
-                            for col in columns_to_compare:
-                                if pd.notna(new_row[col]) and new_row[col] != old_row[col]:
-                                    has_changes = True
-                                    final_data.loc[mask, col] = new_row[col]
-                                    changes_log.append(
-                                        f"Field: {col}\n"
-                                        f"  - Old value: {old_row[col]}\n"
-                                        f"  - New value: {new_row[col]}"
+                    existing_indexed = existing_data.set_index('Id')
+                    new_indexed = new_data.set_index('Id')
+                    # Ids may repeat; each new record is compared with the first existing record of its Id
+                    first_existing = existing_indexed[~existing_indexed.index.duplicated(keep='first')]
+
+                    # Update existing records, comparing every cell in one vectorized pass
+                    matched = new_indexed[new_indexed.index.isin(existing_indexed.index)]
+                    old_values = first_existing.reindex(index=matched.index, columns=matched.columns)
+                    new_array = matched.to_numpy(dtype=object, na_value=None)
+                    old_array = old_values.to_numpy(dtype=object, na_value=None)
+                    changed_mask = matched.notna().to_numpy() & (new_array != old_array)
+                    changed_rows = changed_mask.any(axis=1)
+                    updated_count = int(changed_rows.sum())
+
+                    # Per-record details are only built when debug logging is enabled
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        changes = np.argwhere(changed_mask)
+                        for row, record_id in enumerate(matched.index):
+                            logging.debug("Checking record with ID %s, label: %s", record_id, matched['label'].iat[row])
+                            if changed_rows[row]:
+                                logging.debug("Updates found for ID %s:", record_id)
+                                for _, col in changes[changes[:, 0] == row]:
+                                    logging.debug(
+                                        "Field: %s\n  - Old value: %s\n  - New value: %s",
+                                        matched.columns[col], old_values.iat[row, col], matched.iat[row, col]
                                     )
-
-                            if has_changes:
-                                updated_count += 1
-                                logging.info(f"Updates found for ID {new_row['Id']}:")
-                                for change in changes_log:
-                                    logging.info(change)
                             else:
-                                logging.info(f"No updates needed for ID {new_row['Id']}")
-                        else:
-                            pass  # ID not found in existing data
+                                logging.debug("No updates needed for ID %s", record_id)
+
+                    # Changed values per Id (the last new record wins when an Id repeats), spread over
+                    # every existing record with that Id, as one array aligned with the existing data
+                    changed_values = pd.DataFrame(
+                        np.where(changed_mask, new_array, None), index=matched.index, columns=matched.columns
+                    ).groupby(level=0, sort=False).last()
+                    updates = changed_values.reindex(index=existing_indexed.index, columns=existing_indexed.columns)
+                    update_mask = updates.notna().to_numpy()
+
+                    # Write changed cells straight into an object array so values of any type fit,
+                    # then rebuild the DataFrame once
+                    values = existing_indexed.to_numpy(dtype=object, copy=True)
+                    values[update_mask] = updates.to_numpy(dtype=object)[update_mask]
+                    final_data = pd.DataFrame(
+                        values, index=existing_indexed.index, columns=existing_indexed.columns
+                    ).infer_objects()
+                    final_data = final_data.reset_index()[existing_data.columns]
 
                     # Add new records
-                    existing_ids = set(existing_data['Id'].values)
-                    new_records = new_data[~new_data['Id'].isin(existing_ids)]
+                    new_records = new_data[~new_data['Id'].isin(existing_indexed.index)]
 
                     if not new_records.empty:
                         logging.info(f"New records to add: {len(new_records)}")
-                        for _, row in new_records.iterrows():
-                            logging.info(f"Adding new record - ID: {row['Id']}, Label: {row['label']}")
+                        if logging.getLogger().isEnabledFor(logging.DEBUG):
+                            for record_id, label in zip(new_records['Id'], new_records['label']):
+                                logging.debug("Adding new record - ID: %s, Label: %s", record_id, label)
                         final_data = pd.concat([final_data, new_records], ignore_index=True)
 
                     if updated_count > 0 or not new_records.empty:
                         # Save the updated data to the target file
-                        final_data.to_excel(target_file_path, index=False)
+                        self.write_target(final_data, target_file_path)
                         logging.info(f"Update summary:\n - Updated {updated_count} records\n - Added {len(new_records)} new records")
                     else:
                         logging.info("Data is up to date. No changes made.")
                 else:
                     # If existing data could not be read, write new data to the target file
-                    new_data.to_excel(target_file_path, index=False)
+                    self.write_target(new_data, target_file_path)
                     logging.info(f"Created new file: {target_file_path}")
             except Exception as e:
                 logging.error(f"Error updating file: {target_file_path}, Error: {str(e)}")
                 return False
         else:
             # If target file does not exist, create it with the new data
-            new_data.to_excel(target_file_path, index=False)
+            self.write_target(new_data, target_file_path)
             logging.info(f"Created new file: {target_file_path}")
 
         return True
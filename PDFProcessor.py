@@ -1,15 +1,22 @@
 import os
 import re
-from PyPDF2 import PdfReader, PdfWriter
-from PyPDF2.errors import PdfReadError
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import pikepdf
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from io import BytesIO
 
-def create_overlay(text_header, text_footer, skill_type, year_level, page_size=A4):
+def create_overlay(text_header, text_footer, skill_type=None, year_level=None, page_size=A4):
     """
     Create a single-page PDF for header, footer and labels overlay.
+    Skill type and year level labels are left out when they are None.
     """
+    return BytesIO(_render_overlay(text_header, text_footer, skill_type, year_level, tuple(page_size)))
+
+@lru_cache(maxsize=64)
+def _render_overlay(text_header, text_footer, skill_type, year_level, page_size):
+    """Render the overlay PDF with ReportLab, memoized so each label set is drawn only once."""
     packet = BytesIO()
     can = canvas.Canvas(packet, pagesize=page_size)
     
@@ -19,24 +26,54 @@ def create_overlay(text_header, text_footer, skill_type, year_level, page_size=A
 
     # Set skill type (Reading/Writing)
     can.setFont("Helvetica-Bold", 11)
-    can.drawString(40, page_size[1] - 50, f"Skill: {skill_type}")
+    if skill_type is not None:
+        can.drawString(40, page_size[1] - 50, f"Skill: {skill_type}")
 
     # Set year level
-    can.drawString(40, page_size[1] - 70, f"Year Level: {year_level}")
+    if year_level is not None:
+        can.drawString(40, page_size[1] - 70, f"Year Level: {year_level}")
 
     # Set footer
     can.setFont("Helvetica", 10)
     can.drawString(40, 30, text_footer)  # Footer position
 
     can.save()
-    packet.seek(0)
-    return packet
+    return packet.getvalue()
+
+# Parsed overlays keyed by (header, footer, skill_type, year_level), shared across files, as
+# (overlay PDF, its page as a form XObject, the rectangle to place it in).
+# The Pdf itself is kept because objects taken from it are only valid while it stays open.
+_overlays = {}
+
+def get_overlay(text_header, text_footer, skill_type, year_level):
+    """Return the overlay form XObject for the given labels and its placement rectangle, creating them on first use."""
+    key = (text_header, text_footer, skill_type, year_level)
+    if key not in _overlays:
+        overlay_pdf = pikepdf.Pdf.open(create_overlay(text_header, text_footer, skill_type, year_level))
+        overlay_page = overlay_pdf.pages[0]
+        # Place the overlay in its own coordinates rather than scaling it to each page
+        _overlays[key] = (overlay_pdf, overlay_page.as_form_xobject(), pikepdf.Rectangle(overlay_page.mediabox))
+    _, overlay_form, overlay_rect = _overlays[key]
+    return overlay_form, overlay_rect
+
+def place_overlay(page, overlay_form, overlay_rect):
+    """
+    Draw a form XObject over a page, like Page.add_overlay, but reusing a form already copied into
+    the page's PDF and without coalescing (decoding and re-encoding) the page's existing content.
+    """
+    name = page.add_resource(overlay_form, pikepdf.Name.XObject, prefix='Fx')
+    placement = page.calc_form_xobject_placement(overlay_form, name, overlay_rect, allow_shrink=True, allow_expand=False)
+    page.contents_add(b'q\n', prepend=True)
+    page.contents_add(b'Q\n' + placement)
+
+# Six digit number in file names; its first two digits are the year level
+_SIX_DIGIT = re.compile(r'\d{6}')
 
 def get_year_level(filename):
     """Extract year level from filename's six digit number."""
-    match = re.search(r'(\d{6})', filename)
+    match = _SIX_DIGIT.search(filename)
     if match:
-        year_num = int(match.group(1)[:2])
+        year_num = int(match.group()[:2])
         return f"Year {year_num}" if 1 <= year_num <= 7 else "Unknown Year"
     return "Unknown Year"
 
@@ -49,75 +86,110 @@ def get_skill_type(folder_path):
         return 'Writing'
     return 'Unknown Skill'
 
-def add_header_footer_to_pdf(input_pdf_path, output_pdf_path, header_text, footer_text, skill_type, year_level):
+def make_overlay_fn(header_text, footer_text, labels=True):
+    """
+    Build the function that gives the overlay arguments for a PDF from its folder and file name.
+    With labels, the overlay also shows the skill type and year level; without, only header and footer.
+    """
+    if labels:
+        def overlay_fn(folder_path, file_name):
+            return (header_text, footer_text, get_skill_type(folder_path), get_year_level(file_name))
+    else:
+        def overlay_fn(folder_path, file_name):
+            return (header_text, footer_text, None, None)
+    return overlay_fn
+
+def add_header_footer_to_pdf(input_pdf_path, output_pdf_path, header_text, footer_text, skill_type=None, year_level=None):
     """Add header, footer and labels to PDF files."""
     try:
-        reader = PdfReader(input_pdf_path)
-        writer = PdfWriter()
-        
-        if len(reader.pages) == 0:
-            print(f"Warning: {input_pdf_path} appears to be empty or corrupted")
-            return False
-            
-        for page in reader.pages:
-            overlay_pdf = create_overlay(header_text, footer_text, skill_type, year_level)
-            overlay_reader = PdfReader(overlay_pdf)
-            overlay_page = overlay_reader.pages[0]
-            page.merge_page(overlay_page)
-            writer.add_page(page)
-
-        with open(output_pdf_path, "wb") as output_file:
-            writer.write(output_file)
+        # Memory-map the input so only the parts qpdf actually reads are paged in
+        with pikepdf.Pdf.open(input_pdf_path, access_mode=pikepdf.AccessMode.mmap) as pdf:
+            if len(pdf.pages) == 0:
+                print(f"Warning: {input_pdf_path} appears to be empty or corrupted")
+                return False
+
+            # The overlay is identical for every page, so build it and copy it into this PDF once
+            overlay_form, overlay_rect = get_overlay(header_text, footer_text, skill_type, year_level)
+            overlay_form = pdf.copy_foreign(overlay_form)
+            for page in pdf.pages:
+                place_overlay(page, overlay_form, overlay_rect)
+
+            # Pack small objects into compressed object streams, with a cross-reference stream
+            pdf.save(output_pdf_path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
         
         return True
         
-    except PdfReadError as e:
+    except pikepdf.PdfError as e:
         print(f"Error: Problem processing {input_pdf_path}: {str(e)}")
         return False
     except Exception as e:
         print(f"Unexpected error: Problem processing {input_pdf_path}: {str(e)}")
         return False
 
-def process_folder(folder_path, output_folder, header_text, footer_text):
-    """Process PDFs with additional labels based on folder name and filename."""
+def _iter_pdfs(folder_path):
+    """Yield (folder, file name) for every PDF below folder_path, files before subfolders like os.walk."""
+    subfolders = []
+    try:
+        entries = os.scandir(folder_path)
+    except OSError:
+        # Missing or unreadable folders are skipped, as os.walk does
+        return
+    with entries:
+        for entry in entries:
+            # DirEntry caches the file type from the directory listing, avoiding extra stat calls
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith('.pdf'):
+                yield folder_path, entry.name
+    for subfolder in subfolders:
+        yield from _iter_pdfs(subfolder)
+
+def _process_pdf_task(task):
+    """Worker entry point: add header, footer and labels to one PDF and return the task with its result."""
+    return task, add_header_footer_to_pdf(*task)
+
+def process_folder(folder_path, output_folder, overlay_fn):
+    """
+    Process PDFs with the overlay given by overlay_fn (see make_overlay_fn) for each folder and filename.
+    """
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
+    def iter_tasks():
+        created_dirs = set()
+        for root, file_name in _iter_pdfs(folder_path):
+            current_output_dir = os.path.join(output_folder, os.path.relpath(root, folder_path))
+            if current_output_dir not in created_dirs:
+                os.makedirs(current_output_dir, exist_ok=True)
+                created_dirs.add(current_output_dir)
+
+            input_path = os.path.join(root, file_name)
+            output_path = os.path.join(current_output_dir, file_name)
+            yield (input_path, output_path) + overlay_fn(root, file_name)
+    
     success_count = 0
     error_count = 0
     
-    for root, dirs, files in os.walk(folder_path):
-        rel_path = os.path.relpath(root, folder_path)
-        current_output_dir = os.path.join(output_folder, rel_path)
-        
-        if rel_path != '.':
-            os.makedirs(current_output_dir, exist_ok=True)
-
-        # Get skill type from current folder path
-        skill_type = get_skill_type(root)
-
-        for file_name in files:
-            if file_name.lower().endswith('.pdf'):
-                # Get year level from filename
-                year_level = get_year_level(file_name)
-                
-                input_path = os.path.join(root, file_name)
-                output_path = os.path.join(current_output_dir, file_name)
-                
-                if add_header_footer_to_pdf(input_path, output_path, header_text, footer_text, skill_type, year_level):
-                    success_count += 1
-                    print(f"Successfully processed: {os.path.relpath(input_path, folder_path)}")
+    # Files are independent, so process them in parallel across CPU cores
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for task, succeeded in executor.map(_process_pdf_task, iter_tasks(), chunksize=8):
+            input_path, _, _, _, skill_type, year_level = task
+            if succeeded:
+                success_count += 1
+                print(f"Successfully processed: {os.path.relpath(input_path, folder_path)}")
+                if skill_type is not None:
                     print(f"Added labels - Skill: {skill_type}, {year_level}")
-                else:
-                    error_count += 1
+            else:
+                error_count += 1
     
     print(f"\nProcessing complete! Success: {success_count} files, Failed: {error_count} files")
 
-# Define paths and text
-input_folder = "data"  # Replace with your PDF folder path
-output_folder = "ProcessedData"  # Replace with output folder path
-footer = "New Zealand educational sources"
-header = "only use for EduGPT Callaghan Innovation"
+if __name__ == "__main__":
+    # Define paths and text
+    input_folder = "data"  # Replace with your PDF folder path
+    output_folder = "ProcessedData"  # Replace with output folder path
+    footer = "New Zealand educational sources"
+    header = "only use for EduGPT Callaghan Innovation"
 
-# Process all PDF files in the folder
-process_folder(input_folder, output_folder, header, footer)
+    # Process all PDF files in the folder
+    process_folder(input_folder, output_folder, make_overlay_fn(header, footer, labels=True))
@@ -1,25 +1,93 @@
-from PyPDF2 import PdfReader, PdfWriter, PdfMerger
+from PyPDF2 import PdfReader
+import pikepdf
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
 from reportlab.lib.pagesizes import A4
 from io import BytesIO
 from tqdm import tqdm
+import numpy as np
+import bisect
+import hashlib
+import json
+import mmap
 import os
+import queue
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from operator import itemgetter
 
-def add_header_footer(canvas_obj, skill_type, year, title, page_num):
-    """添加页眉页脚"""
-    # 保存当前图形状态
-    canvas_obj.saveState()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 目录条目的字体及其字符宽度表（标准字体的字形宽度为1/1000字号的整数单位），避免换行时反复查询字体度量
+TOC_FONT_NAME = 'Helvetica'
+TOC_FONT_SIZE = 12
+_TOC_CHAR_WIDTHS = {chr(i): round(pdfmetrics.stringWidth(chr(i), TOC_FONT_NAME, 1000)) for i in range(128)}
+
+def toc_text_units(text):
+    """按目录字体计算文本宽度（1/1000字号单位），乘以0.001 * TOC_FONT_SIZE即与canvas.stringWidth结果一致"""
+    widths = _TOC_CHAR_WIDTHS
+    total = 0
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            # 非ASCII字符首次出现时查询并加入表中
+            width = widths[char] = round(pdfmetrics.stringWidth(char, TOC_FONT_NAME, 1000))
+        total += width
+    return total
+
+def wrap_toc_entry(entry, content_width):
+    """
+    按单词贪心换行，结果与逐词试排并测量整行宽度相同。
+    用单词宽度的前缀和表示任意一段单词连成一行的宽度，每行能容纳到哪个单词由二分查找一次得出。
+    """
+    words = entry.split()
+    if not words:
+        return []
     
-    # 设置页眉
-    canvas_obj.setFont('Helvetica', 10)
+    # 一行的最大宽度换算为整数单位（与toc_text_units(...) * 0.001 * TOC_FONT_SIZE <= content_width等价）
+    max_units = int(content_width / (0.001 * TOC_FONT_SIZE)) + 1
+    while max_units * 0.001 * TOC_FONT_SIZE > content_width:
+        max_units -= 1
+    
+    # ends[j]为从第一个单词到第j个单词（含单词间空格）的宽度，starts[j]为第j个单词的起始位置
+    space = _TOC_CHAR_WIDTHS[' ']
+    word_units = np.array([toc_text_units(word) for word in words], dtype=np.int64)
+    ends = np.cumsum(word_units + space) - space
+    starts = ends - word_units
+    
+    lines = []
+    i = 0
+    while i < len(words):
+        # 第i个单词起的一行最多排到第j个单词；单个单词超宽时独占一行
+        j = max(int(np.searchsorted(ends, starts[i] + max_units, side='right')) - 1, i)
+        lines.append(' '.join(words[i:j + 1]))
+        i = j + 1
+    return lines
+
+def get_header_text(skill_type, year, title):
+    """生成页眉文本"""
     header_text = f"LPF-{skill_type}-{year}-{title}"
     # 如果标题太长，进行截断
-    if canvas_obj.stringWidth(header_text) > A4[0] - 100:
+    if pdfmetrics.stringWidth(header_text, 'Helvetica', 10) > A4[0] - 100:
         max_title_length = 50
         if len(title) > max_title_length:
             title = title[:max_title_length] + "..."
         header_text = f"LPF-{skill_type}-{year}-{title}"
+    return header_text
+
+def add_header_footer(canvas_obj, skill_type, year, title, page_num):
+    """添加页眉页脚"""
+    # 保存当前图形状态
+    canvas_obj.saveState()
+    
+    # 设置页眉
+    canvas_obj.setFont('Helvetica', 10)
+    header_text = get_header_text(skill_type, year, title)
     
     canvas_obj.drawString(50, A4[1] - 30, header_text)
     
@@ -88,29 +156,15 @@ def create_toc_page(file_list, skill_type, start_page=2):
             can.setFont("Helvetica-Bold", 18)
             can.drawString(100, 750, "Table of Contents")
         
-        can.setFont("Helvetica", 12)
+        # 本页所有条目写入同一个文本对象，最后一次性输出到画布
+        toc_text = can.beginText()
+        toc_text.setFont(TOC_FONT_NAME, TOC_FONT_SIZE, line_height)
         while current_index < len(file_list):
             title, year = file_list[current_index]
             entry = f"{current_index + 1}. {title} - {year}"
             
             # 处理长文本换行
-            words = entry.split()
-            lines = []
-            current_line = []
-            
-            for word in words:
-                test_line = ' '.join(current_line + [word])
-                if can.stringWidth(test_line) <= content_width:
-                    current_line.append(word)
-                else:
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                        current_line = [word]
-                    else:
-                        lines.append(word)
-            
-            if current_line:
-                lines.append(' '.join(current_line))
+            lines = wrap_toc_entry(entry, content_width)
             
             # 检查剩余空间
             needed_height = len(lines) * line_height + 5
@@ -118,15 +172,18 @@ def create_toc_page(file_list, skill_type, start_page=2):
                 # 只有当页面已经有内容时才创建新页
                 if current_index > start_index:
                     current_page += 1
+                    can.drawText(toc_text)
                     return current_index
                 
             # 绘制条目
+            toc_text.setTextOrigin(margin_left, y)
             for line in lines:
-                can.drawString(margin_left, y, line)
+                toc_text.textLine(line)
                 y -= line_height
             y -= 5
             current_index += 1
         
+        can.drawText(toc_text)
         return current_index
     
     # 处理所有条目
@@ -143,28 +200,283 @@ def create_toc_page(file_list, skill_type, start_page=2):
     packet.seek(0)
     return packet
 
-def extract_title_from_pdf(pdf_path):
-    """Extract title from first page of PDF."""
+TITLE_CACHE_FILE = ".title_cache.json"
+
+def load_title_cache(folder):
+    """读取文件夹中保存的标题缓存 {"路径:修改时间(纳秒):文件大小": [标题, 页数]}（有orjson时用其解析）"""
+    cache_path = os.path.join(folder, TITLE_CACHE_FILE)
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except (OSError, ValueError):
+        return {}
+
+def save_title_cache(folder, title_cache):
+    """将标题缓存保存到文件夹中，供下次运行复用（先写临时文件再替换，中断时不会留下不完整的缓存）"""
+    cache_path = os.path.join(folder, TITLE_CACHE_FILE)
+    if orjson is not None:
+        data = orjson.dumps(title_cache)
+    else:
+        data = json.dumps(title_cache, ensure_ascii=False).encode('utf-8')
     try:
-        reader = PdfReader(pdf_path)
-        if len(reader.pages) > 0:
-            first_page = reader.pages[0]
-            text = first_page.extract_text()
-            # 获取第一行作为标题
-            lines = text.split('\n')
-            if lines:
-                return lines[0].strip()
+        with open(cache_path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(cache_path + '.tmp', cache_path)
+    except OSError as e:
+        print(f"Warning: Could not save title cache {cache_path}: {str(e)}")
+
+def extract_pdf_info(pdf_path, title_cache=None, used_cache=None):
+    """
+    Extract title and page count of a PDF, reusing cached values of unchanged files.
+    Files are matched by path, modification time and size. The entry used is also stored in
+    used_cache (title_cache by default), so stale entries can be left out when saving.
+    The page count is None when the PDF could not be read.
+    """
+    stat = os.stat(pdf_path)
+    key = f"{pdf_path}:{stat.st_mtime_ns}:{stat.st_size}"
+    if used_cache is None:
+        used_cache = title_cache
+    
+    cached = title_cache.get(key) if title_cache is not None else None
+    if cached is None:
+        cached = list(_read_pdf_info(pdf_path, stat.st_mtime_ns, stat.st_size))
+    if used_cache is not None:
+        used_cache[key] = cached
+    return cached[0], cached[1]
+
+@lru_cache(maxsize=None)
+def _read_pdf_info(pdf_path, mtime_ns, size):
+    """
+    读取PDF首页文本的第一行作为标题，并顺带取得页数（PdfReader按需解析，只会解码第一页；
+    页数在此一并记录，合并时无需为统计页数再次打开文件）
+    """
+    try:
+        # 通过内存映射读取，只有解析时实际访问到的部分（交叉引用表和首页对象）才会从磁盘载入
+        with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_RANDOM)  # 访问是跳跃的，避免系统做无用的预读
+            reader = PdfReader(mm)
+            page_count = len(reader.pages)
+            if page_count > 0:
+                first_page = reader.pages[0]
+                text = first_page.extract_text()
+                # 获取第一行作为标题
+                lines = text.split('\n')
+                if lines:
+                    return lines[0].strip(), page_count
+            return "Untitled", page_count
     except Exception as e:
         print(f"Warning: Could not extract title from {pdf_path}: {str(e)}")
-    return "Untitled"
+    return "Untitled", None
+
+# 文件名中的六位数字编号（前两位为年级）
+_SIX_DIGIT = re.compile(r'\d{6}')
 
-def get_year_level(filename):
-    """Extract year level from filename's six digit number."""
-    match = re.search(r'(\d{6})', filename)
+# 没有编号和年级超出范围的文件使用的年级数字，排在各年级之前（与按年级名称排序的顺序一致）
+GENERAL_YEAR = -2
+UNKNOWN_YEAR = -1
+
+def get_year_number(filename):
+    """Extract year number from filename's six digit number, used as the sort key."""
+    match = _SIX_DIGIT.search(filename)
     if match:
-        year_num = int(match.group(1)[:2])
-        return f"Year {year_num}" if 1 <= year_num <= 7 else "Unknown Year"
-    return "General Year"
+        year_num = int(match.group()[:2])
+        return year_num if 1 <= year_num <= 7 else UNKNOWN_YEAR
+    return GENERAL_YEAR
+
+def year_level_name(year_num):
+    """年级数字对应的年级名称"""
+    if year_num == GENERAL_YEAR:
+        return "General Year"
+    if year_num == UNKNOWN_YEAR:
+        return "Unknown Year"
+    return f"Year {year_num}"
+
+# 每个分片进程在保存位置之后最多预读的文件数，预读量有上限，不会挤掉尚未读取的文件
+PREFETCH_AHEAD = 4
+
+def _prefetch(paths):
+    """提示操作系统异步预读文件内容到页缓存（不支持posix_fadvise的平台直接跳过）"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def _pdf_string(text):
+    """将文本转为WinAnsi编码的PDF字面字符串，含无法编码的字符时返回None"""
+    try:
+        data = text.encode('cp1252')
+    except UnicodeEncodeError:
+        return None
+    for char, escaped in ((b'\\', b'\\\\'), (b'(', b'\\('), (b')', b'\\)'), (b'\r', b'\\r')):
+        data = data.replace(char, escaped)
+    return b'(' + data + b')'
+
+# 页眉页脚字体在页面资源中的名称（固定名称使同一文件各页的内容流完全相同，只有页码不同）
+_HEADER_FONT = pikepdf.Name('/LPFHelvetica')
+
+def _header_footer_template(header):
+    """
+    生成一个文件的页眉页脚内容流模板（与add_header_footer的绘制结果相同），返回页码前后的两段字节。
+    开头的Q结束包住原页面内容的q。
+    """
+    head = b''.join([
+        b'Q\nq 0 g BT ', _HEADER_FONT.unparse(), b' 10 Tf 12 TL ET\n',
+        b'BT 1 0 0 1 50 %.4f Tm ' % (A4[1] - 30), header, b' Tj T* ET\n',
+        b'BT 1 0 0 1 50 30 Tm (New Zealand Educational Sources) Tj T* ET\n',
+        b'BT 1 0 0 1 %.4f 30 Tm (' % (A4[0] - 50),
+    ])
+    return head, b') Tj T* ET\nQ\n'
+
+def _add_header_footer_pages(src_pdf, skill_type, year, title, start_page):
+    """
+    为PDF的每一页添加页眉页脚。
+    页眉页脚按模板直接以内容流追加到原页面，无需经ReportLab生成再解析；返回None。
+    页眉含WinAnsi无法编码的字符时改用ReportLab叠加，返回页眉页脚PDF（需保持打开直到引用它的文档保存完成）。
+    """
+    header = _pdf_string(get_header_text(skill_type, year, title))
+    if header is None:
+        return _overlay_header_footer_pages(src_pdf, skill_type, year, title, start_page)
+
+    font = src_pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.Font, Subtype=pikepdf.Name.Type1,
+        BaseFont=pikepdf.Name.Helvetica, Encoding=pikepdf.Name.WinAnsiEncoding,
+    ))
+    head, tail = _header_footer_template(header)
+    for page_num, page in enumerate(src_pdf.pages, start_page):
+        page.add_resource(font, pikepdf.Name.Font, _HEADER_FONT)
+        # 原内容包在q/Q中，使页眉页脚不受原页面遗留的图形状态影响
+        page.contents_add(b'q\n', prepend=True)
+        page.contents_add(head + str(page_num).encode() + tail)
+    return None
+
+def _overlay_header_footer_pages(src_pdf, skill_type, year, title, start_page):
+    """用ReportLab生成页眉页脚并叠加到PDF的每一页，返回页眉页脚PDF（需保持打开直到引用它的文档保存完成）"""
+    page_count = len(src_pdf.pages)
+    
+    # 一次性生成该文件所有页面的页眉页脚（一个画布，每页一次showPage）
+    packet = BytesIO()
+    can = canvas.Canvas(packet, pagesize=A4)
+    for i in range(page_count):
+        add_header_footer(can, skill_type, year, title, start_page + i)
+        can.showPage()
+    can.save()
+    packet.seek(0)
+    
+    # 处理每一页，直接在原页面上叠加页眉页脚（按页眉页脚自身坐标放置，不缩放）
+    overlay_pdf = pikepdf.Pdf.open(packet)
+    for page, overlay_page in zip(src_pdf.pages, overlay_pdf.pages):
+        page.add_overlay(overlay_page, pikepdf.Rectangle(overlay_page.mediabox))
+    return overlay_pdf
+
+def _resource_key(obj, memo):
+    """计算资源对象的内容摘要（递归展开间接引用），内容相同的对象摘要相同"""
+    # 数字、布尔值和null取出后是Python的int/Decimal/bool/None，不是pikepdf.Object
+    if not isinstance(obj, pikepdf.Object):
+        return hashlib.sha1(repr(obj).encode()).digest()
+
+    if obj.is_indirect:
+        objgen = obj.objgen
+        if objgen in memo:
+            key = memo[objgen]
+            if key is None:
+                # 循环引用：按对象编号取摘要，不同的对象不会因此得到相同的摘要
+                key = hashlib.sha1(b'cycle %d %d' % objgen).digest()
+            return key
+        memo[objgen] = None  # 正在计算
+
+    digest = hashlib.sha1()
+    if isinstance(obj, pikepdf.Stream):
+        digest.update(b'stream')
+        digest.update(obj.read_raw_bytes())
+    if isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+        digest.update(b'<<')
+        for key in sorted(obj.keys()):
+            digest.update(key.encode())
+            digest.update(_resource_key(obj[key], memo))
+    elif isinstance(obj, pikepdf.Array):
+        digest.update(b'[')
+        for item in obj:
+            digest.update(_resource_key(item, memo))
+    else:
+        digest.update(obj.unparse())
+
+    key = digest.digest()
+    if obj.is_indirect:
+        memo[objgen] = key
+    return key
+
+def dedupe_resources(pdf):
+    """让各页/Resources中内容相同的字体和XObject引用同一个对象，返回替换的引用数（多余的副本在保存时不再写出）"""
+    memo = {}
+    canonical = {}
+    replaced = 0
+    for page in pdf.pages:
+        resources = page.obj.get(pikepdf.Name.Resources)
+        if not isinstance(resources, pikepdf.Dictionary):
+            continue
+        for res_type in (pikepdf.Name.Font, pikepdf.Name.XObject):
+            res_dict = resources.get(res_type)
+            if not isinstance(res_dict, pikepdf.Dictionary):
+                continue
+            for name in list(res_dict.keys()):
+                obj = res_dict[name]
+                if not obj.is_indirect:
+                    continue
+                first = canonical.setdefault((str(res_type), _resource_key(obj, memo)), obj)
+                if first.objgen != obj.objgen:
+                    res_dict[name] = first
+                    replaced += 1
+    return replaced
+
+def _process_shard(shard):
+    """处理一段连续的文件并合并为一个分片，写入给定的临时文件，返回(分片序号, 分片文件路径)（供进程池调用）"""
+    shard_index, tasks, shard_path = shard
+    shard_pdf = pikepdf.Pdf.new()
+    open_pdfs = []
+    paths = [task[0] for task in tasks]
+    file_ends = []  # 各文件最后一页在分片中的累计页数
+    for file_path, title, year, start_page, page_count, skill_type in tasks:
+        src_pdf = pikepdf.Pdf.open(file_path, access_mode=pikepdf.AccessMode.mmap)
+        # 起始页码按扫描时的页数预先算好，页数不符时其后所有页码都会错位
+        if len(src_pdf.pages) != page_count:
+            raise ValueError(
+                f"{file_path}: expected {page_count} pages from the scan, pikepdf found {len(src_pdf.pages)}"
+            )
+        overlay_pdf = _add_header_footer_pages(src_pdf, skill_type, year, title, start_page)
+        shard_pdf.pages.extend(src_pdf.pages)
+        file_ends.append(len(shard_pdf.pages))
+        open_pdfs.append(src_pdf)
+        if overlay_pdf is not None:
+            open_pdfs.append(overlay_pdf)
+    
+    # 源文件的页面内容在保存时才按页序读取：按保存进度估算正在读取的文件，只预读其后PREFETCH_AHEAD个文件
+    prefetched = 0
+    def prefetch_ahead(percent):
+        nonlocal prefetched
+        current = bisect.bisect_left(file_ends, len(shard_pdf.pages) * percent / 100)
+        end = min(current + 1 + PREFETCH_AHEAD, len(paths))
+        if end > prefetched:
+            _prefetch(paths[prefetched:end])
+            prefetched = end
+    
+    # 分片在各自进程中完成序列化；分片只是中间结果，新增的内容流留到最终保存时统一压缩
+    prefetch_ahead(0)
+    shard_pdf.save(shard_path, compress_streams=False, progress=prefetch_ahead)
+    shard_pdf.close()
+    for pdf in open_pdfs:
+        pdf.close()
+    return shard_index, shard_path
 
 def merge_pdfs_by_type(input_folder, output_folder):
     """按类型合并PDF文件"""
@@ -173,79 +485,139 @@ def merge_pdfs_by_type(input_folder, output_folder):
     
     # 收集文件
     print("正在扫描PDF文件...")
-    for root, _, files in os.walk(input_folder):
-        pdf_files = [f for f in files if f.lower().endswith('.pdf')]
-        for file in tqdm(pdf_files, desc="扫描文件"):
-            full_path = os.path.join(root, file)
-            year_level = get_year_level(file)
-            title = extract_title_from_pdf(full_path)
-            
-            if 'reading' in root.lower():
-                reading_files.append((full_path, title, year_level))
-            elif 'writing' in root.lower():
-                writing_files.append((full_path, title, year_level))
+    title_cache = load_title_cache(input_folder)
+    pdf_files = [
+        (root, file)
+        for root, _, files in os.walk(input_folder)
+        for file in files if file.lower().endswith('.pdf')
+    ]
+    
+    # 标题提取以读盘为主，使用线程池并行以重叠磁盘读取；未变化的文件直接使用缓存
+    paths = [os.path.join(root, file) for root, file in pdf_files]
+    used_cache = {}
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 4)) as executor:
+        infos = list(tqdm(
+            executor.map(lambda path: extract_pdf_info(path, title_cache, used_cache), paths),
+            total=len(paths), desc="扫描文件"
+        ))
+    
+    for (root, file), full_path, (title, page_count) in zip(pdf_files, paths, infos):
+        # 年级数字在扫描时算好，排序时直接比较整数
+        year_num = get_year_number(file)
+        year_level = year_level_name(year_num)
+        
+        if 'reading' in root.lower():
+            reading_files.append((full_path, title, year_level, page_count, year_num))
+        elif 'writing' in root.lower():
+            writing_files.append((full_path, title, year_level, page_count, year_num))
+
+    # 只保存本次扫描到的文件，已删除或已修改文件的旧条目随之丢弃
+    save_title_cache(input_folder, used_cache)
 
     # 确保输出目录存在
     os.makedirs(output_folder, exist_ok=True)
     
     # 处理每种类型
     for skill_type, files in [("Reading", reading_files), ("Writing", writing_files)]:
-        merger = PdfMerger()
+        merged_pdf = pikepdf.Pdf.new()
+        # 被复制页面的数据在保存时才从源文件读取，因此源文件需保持打开直到保存完成
+        open_pdfs = []
         current_page = 1  # 从1开始计数
         
         # 添加介绍页
         print(f"\n处理 {skill_type} 文件...")
         print("创建介绍页...")
-        intro_pdf = create_intro_page(skill_type)
-        merger.append(PdfReader(intro_pdf))
+        intro_pdf = pikepdf.Pdf.open(create_intro_page(skill_type))
+        open_pdfs.append(intro_pdf)
+        merged_pdf.pages.extend(intro_pdf.pages)
         current_page += 1
         
         # 添加目录页
         print("创建目录页...")
-        toc_list = [(title, year) for _, title, year in files]
-        toc_pdf = create_toc_page(toc_list, skill_type)
-        merger.append(PdfReader(toc_pdf))
+        toc_list = [(title, year) for _, title, year, _, _ in files]
+        toc_pdf = pikepdf.Pdf.open(create_toc_page(toc_list, skill_type))
+        open_pdfs.append(toc_pdf)
+        merged_pdf.pages.extend(toc_pdf.pages)
         current_page += 1
         
         # 添加所有PDF并显示进度
         print("合并PDF文件...")
-        sorted_files = sorted(files, key=lambda x: x[2])  # 按年级排序
+        sorted_files = sorted(files, key=itemgetter(4))  # 按年级排序
         
-        for file_path, title, year in tqdm(sorted_files, desc=f"合并{skill_type}文件"):
-            reader = PdfReader(file_path)
-            writer = PdfWriter()
-            
-            # 处理每一页
-            for i in range(len(reader.pages)):
-                # 创建新的页面，添加页眉页脚
-                packet = BytesIO()
-                can = canvas.Canvas(packet, pagesize=A4)
-                add_header_footer(can, skill_type, year, title, current_page)
-                can.save()
-                packet.seek(0)
-                
-                # 获取原始页面
-                page = reader.pages[i]
-                watermark = PdfReader(packet)
-                page.merge_page(watermark.pages[0])
-                writer.add_page(page)
-                
-                current_page += 1  # 递增页码
-            
-            # 将处理后的文件添加到合并器
-            output = BytesIO()
-            writer.write(output)
-            output.seek(0)
-            merger.append(output)
+        # 根据扫描时取得的页数确定各文件的起始页码，只有读取失败的文件才需重新打开统计
+        start_pages = []
+        page_counts = []
+        for file_path, _, _, page_count, _ in sorted_files:
+            start_pages.append(current_page)
+            if page_count is None:
+                with pikepdf.Pdf.open(file_path) as pdf:
+                    page_count = len(pdf.pages)
+            page_counts.append(page_count)
+            current_page += page_count
         
-        # 保存最终文档
-        output_path = os.path.join(output_folder, f"{skill_type}_Collection.pdf")
-        print(f"正在保存 {output_path}...")
-        with open(output_path, 'wb') as f:
-            merger.write(f)
+        # 各文件相互独立，按顺序切分为连续的分片，每个进程处理并序列化一个分片
+        tasks = [
+            (file_path, title, year, start_page, page_count, skill_type)
+            for (file_path, title, year, _, _), start_page, page_count in zip(sorted_files, start_pages, page_counts)
+        ]
+        shard_count = min(len(tasks), os.cpu_count() or 1)
         
-        print(f"✓ 已创建 {skill_type} 合集: {output_path}")
-        merger.close()
+        # 分片写入输出目录下的临时文件，只把路径传回父进程；父进程以内存映射打开分片，
+        # 最终保存时按需读取页面数据，内存中不保留整个合集。临时文件在保存完成后删除
+        shard_paths = []
+        try:
+            for i in range(shard_count):
+                with tempfile.NamedTemporaryFile(
+                    dir=output_folder, prefix=f".{skill_type}_shard{i}_", suffix=".pdf", delete=False
+                ) as f:
+                    shard_paths.append(f.name)
+            shards = [
+                (i, tasks[i * len(tasks) // shard_count:(i + 1) * len(tasks) // shard_count], shard_paths[i])
+                for i in range(shard_count)
+            ]
+            
+            # 分片完成顺序不定，用优先队列按分片序号取出，保证合集仍按年级排序
+            shard_queue = queue.PriorityQueue()
+            if shards:
+                with ProcessPoolExecutor(max_workers=shard_count) as executor:
+                    futures = [executor.submit(_process_shard, shard) for shard in shards]
+                    for future in tqdm(as_completed(futures), total=len(futures), desc=f"合并{skill_type}文件"):
+                        shard_queue.put(future.result())
+            while not shard_queue.empty():
+                _, shard_path = shard_queue.get()
+                shard_pdf = pikepdf.Pdf.open(shard_path, access_mode=pikepdf.AccessMode.mmap)
+                merged_pdf.pages.extend(shard_pdf.pages)
+                open_pdfs.append(shard_pdf)
+            
+            # 各文件各自带有相同的字体等资源，保存前合并为一份
+            print("合并重复资源...")
+            replaced = dedupe_resources(merged_pdf)
+            print(f"已合并 {replaced} 个重复的字体/图像引用")
+            
+            # 保存最终文档
+            output_path = os.path.join(output_folder, f"{skill_type}_Collection.pdf")
+            print(f"正在保存 {output_path}...")
+            # 以大缓冲区顺序写出，写完后提示系统不必在页缓存中保留输出文件
+            with open(output_path, 'wb', buffering=1 << 20) as f:
+                merged_pdf.save(
+                    f, linearize=False, compress_streams=True,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                )
+                f.flush()
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            
+            print(f"✓ 已创建 {skill_type} 合集: {output_path}")
+        finally:
+            # 先关闭文档（释放内存映射），再删除分片临时文件
+            merged_pdf.close()
+            for pdf in open_pdfs:
+                pdf.close()
+            for shard_path in shard_paths:
+                try:
+                    os.remove(shard_path)
+                except OSError:
+                    pass
 
     print("\n所有文件处理完成!")
 
@@ -0,0 +1,82 @@
+import logging
+import os
+import re
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from DataProcess import DataProcessor
+
+BUSINESS = "Business / Organisation"
+
+
+def _source(records):
+    """A source workbook frame with the columns match_and_fill_headers reads for business records."""
+    return pd.DataFrame({
+        "Id": [record[0] for record in records],
+        "Type": BUSINESS,
+        "Are you a member of the Artificial Intelligence Researchers Association?": "No",
+        "Is your organisation a member of AI Forum NZ?": "No",
+        "Full Name": None,
+        "Business / Organisation Name": [record[1] for record in records],
+        "Professional website/ Social URL": None,
+        "Website": None,
+        "Organisation": None,
+        "Business / Organisation Description": None,
+        "Contact email": [record[2] for record in records],
+        "Stage": [record[3] for record in records],
+    })
+
+
+def _update_counts(caplog):
+    summary = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Update summary")]
+    assert len(summary) == 1
+    return tuple(int(count) for count in re.findall(r"(\d+)", summary[0]))
+
+
+def test_update_excel_with_repeated_ids(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    caplog.set_level(logging.INFO)
+    processor = DataProcessor()
+
+    # Id 2 is repeated, so the created target holds two records for it
+    _source([
+        (1, "Alpha", "alpha@example.com", "Startup"),
+        (2, "Beta", "beta@example.com", "Startup"),
+        (2, "Beta", "beta@example.com", "Startup"),
+    ]).to_excel("first.xlsx", index=False)
+    assert processor.update_excel("first.xlsx", "target.xlsx")
+
+    # Id 2 is repeated again with two different emails: both records count as updates and the last one wins
+    _source([
+        (1, "Alpha", "alpha@example.com", "Growth"),
+        (2, "Beta", "beta@new.example.com", "Startup"),
+        (2, "Beta", "beta@last.example.com", "Startup"),
+        (3, "Gamma", "gamma@example.com", "Seed"),
+    ]).to_excel("second.xlsx", index=False)
+    caplog.clear()
+    assert processor.update_excel("second.xlsx", "target.xlsx")
+
+    assert _update_counts(caplog) == (3, 1)
+    final = pd.read_excel("target.xlsx")
+    assert final["Id"].tolist() == [1, 2, 2, 3]
+    assert final["label"].tolist() == ["Alpha", "Beta", "Beta", "Gamma"]
+    assert final["Contact email"].tolist() == [
+        "alpha@example.com", "beta@last.example.com", "beta@last.example.com", "gamma@example.com"
+    ]
+    assert final["Stage"].tolist() == ["Growth", "Startup", "Startup", "Seed"]
+
+
+def test_modify_content_keeps_non_text_values():
+    processor = DataProcessor()
+    df = pd.DataFrame({
+        "AI Technologies": [5, "ai; ml", None],
+        "Which of the following apply to you?": ["x;ai", 7.5, None],
+    })
+
+    result = processor.modify_content(df)
+
+    assert result["AI Technologies"].tolist() == [5, "AI| ML", None]
+    assert result["Which of the following apply to you?"].tolist() == ["x|AI", 7.5, None]
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pikepdf
+from pikepdf import Array, Dictionary, Name
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PDF_Augment import dedupe_resources
+
+
+def _truetype_font(pdf):
+    """A TrueType font with /Widths, /FirstChar and a descriptor with /FontBBox, as real PDFs carry."""
+    descriptor = pdf.make_indirect(Dictionary(
+        Type=Name.FontDescriptor, FontName=Name.Arial, Flags=32,
+        FontBBox=Array([-665, -325, 2000, 1040]), ItalicAngle=0,
+        Ascent=905, Descent=-212, CapHeight=716, StemV=80,
+    ))
+    return pdf.make_indirect(Dictionary(
+        Type=Name.Font, Subtype=Name.TrueType, BaseFont=Name.Arial,
+        FirstChar=32, LastChar=34, Widths=Array([278, 278, 355]),
+        FontDescriptor=descriptor, Encoding=Name.WinAnsiEncoding,
+    ))
+
+
+def _form_xobject(pdf):
+    """A form XObject, which always has a /BBox array."""
+    return pdf.make_stream(
+        b'0 0 m 10 10 l S',
+        Type=Name.XObject, Subtype=Name.Form, BBox=Array([0, 0, 595.2756, 841.8898]),
+    )
+
+
+def _add_page(pdf, font, form):
+    pdf.add_blank_page()
+    page = pdf.pages[-1]
+    page.add_resource(font, Name.Font, Name.F1)
+    page.add_resource(form, Name.XObject, Name.Fx1)
+    return page
+
+
+def test_dedupe_resources_merges_identical_fonts_and_forms():
+    pdf = pikepdf.new()
+    pages = [_add_page(pdf, _truetype_font(pdf), _form_xobject(pdf)) for _ in range(3)]
+
+    assert dedupe_resources(pdf) == 4
+
+    fonts = {page.Resources.Font.F1.objgen for page in pages}
+    forms = {page.Resources.XObject.Fx1.objgen for page in pages}
+    assert len(fonts) == 1
+    assert len(forms) == 1
+
+
+def test_dedupe_resources_keeps_different_objects():
+    pdf = pikepdf.new()
+    font = _truetype_font(pdf)
+    other_font = _truetype_font(pdf)
+    other_font.Widths = Array([278, 278, 400])
+    form = _form_xobject(pdf)
+    other_form = _form_xobject(pdf)
+    other_form.BBox = Array([0, 0, 612, 792])
+    first = _add_page(pdf, font, form)
+    second = _add_page(pdf, other_font, other_form)
+
+    assert dedupe_resources(pdf) == 0
+    assert first.Resources.Font.F1.objgen != second.Resources.Font.F1.objgen
+    assert first.Resources.XObject.Fx1.objgen != second.Resources.XObject.Fx1.objgen
+
+
+def test_dedupe_resources_does_not_merge_distinct_cyclic_objects():
+    pdf = pikepdf.new()
+    # child points back to its parent, loop points back to itself: both are reached through a cycle
+    parent = pdf.make_indirect(Dictionary(Kid=None))
+    child = pdf.make_indirect(Dictionary(Up=parent))
+    parent.Kid = child
+    loop = pdf.make_indirect(Dictionary(Up=None))
+    loop.Up = loop
+    pages = []
+    for obj in (parent, child, loop):
+        pdf.add_blank_page()
+        pages.append(pdf.pages[-1])
+        pages[-1].add_resource(obj, Name.Font, Name.F1)
+
+    assert dedupe_resources(pdf) == 0
+    assert len({page.Resources.Font.F1.objgen for page in pages}) == 3